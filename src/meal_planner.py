@@ -1,9 +1,19 @@
 import os
 import re
+import json
+import time
+import heapq
+import random
 import asyncio
+import functools
+import threading
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 # Import custom agent modules (make sure these are installed and available)
-from agents import Agent, Runner, WebSearchTool, function_tool
+from agents import Agent, Runner, WebSearchTool, function_tool, set_default_openai_client
+from openai import AsyncOpenAI, RateLimitError
 import logging
 from judgeval.tracer import Tracer
 
@@ -14,12 +24,71 @@ judgment = Tracer(project_name="meal_planner_assessment")
 # --- Setup Environment and Logging ---
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# The log format doesn't use thread/process fields, so skip collecting them
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+# --- Pricing Configuration ---
+STORE = "Walmart"
+LOCATION = "Watertown, Connecticut"
+PRICE_CACHE_PATH = os.getenv("PRICE_CACHE_PATH", ".price_cache.json")
+PRICE_CACHE_TTL = 24 * 60 * 60  # seconds
+MAX_SEARCH_RETRIES = 4
+REVISION_TOP_K = 3  # most expensive items to swap out per revision
+EARLY_STOP_RATIO = 1.25  # stop pricing once the running total passes budget * ratio
+
+# Staples priced speculatively while the first plan is being generated
+BASE_STAPLES = ["Eggs", "Milk", "Onions", "Garlic", "Rice", "Chicken breast"]
+CUISINE_STAPLES = {
+    "mexican": ["Tortillas", "Black beans", "Salsa", "Avocados"],
+    "italian": ["Pasta", "Tomato sauce", "Parmesan cheese", "Olive oil"],
+    "indian": ["Lentils", "Basmati rice", "Chickpeas", "Yogurt"],
+    "chinese": ["Soy sauce", "Tofu", "Ginger", "Green onions"],
+    "japanese": ["Soy sauce", "Tofu", "Miso paste", "Nori"],
+    "mediterranean": ["Chickpeas", "Olive oil", "Feta cheese", "Pita bread"],
+    "thai": ["Coconut milk", "Jasmine rice", "Fish sauce", "Limes"],
+}
+
+# --- Token Budget Configuration ---
+TOKEN_BUDGET = int(os.getenv("TOKEN_BUDGET", "200000"))
+PLANNER_TOKEN_ESTIMATE = 6000
+WEB_SEARCH_TOKEN_ESTIMATE = 3000
+
+# Caps concurrent web searches to stay under provider rate limits
+_PRICE_SEM = asyncio.Semaphore(8)
+
+# --- Precompiled Patterns ---
+_PRICE_RE = re.compile(r'\$?(\d+\.\d{2})')
+_PAREN_RE = re.compile(r'\s*\([^)]*\)')
+_BUDGET_RE = re.compile(r'Budget: \$?(\d+)')
+_PANTRY_RE = re.compile(r'Pantry Leftovers\**:\s*([^\n]*)')
+_CUISINE_RE = re.compile(r'Cultural Preferences\**:\s*([^\n]*)')
+_BATCH_LINE_RE = re.compile(r'^\s*(\d+)\.\s*(.*)$', re.M)
 
 # --- Helper Functions ---
+_DIGITS = "0123456789"
+
+def _price_at(text: str, start: int) -> str:
+    """
+    Returns the 'digits.dd' price starting exactly at `start`, or '' if none.
+    """
+    end = start
+    n = len(text)
+    while end < n and text[end] in _DIGITS:
+        end += 1
+    if end == start or end + 2 >= n:
+        return ""
+    if text[end] != '.' or text[end + 1] not in _DIGITS or text[end + 2] not in _DIGITS:
+        return ""
+    return text[start:end + 3]
+
 @judgment.observe(span_type="function")
 def _parse_price(text: str) -> float:
     """
     Extracts a float price from a string (e.g., '$4.99' -> 4.99).
+    Prices directly following a '$' are preferred; otherwise the first
+    'digits.dd' run in the text is used.
     
     Args:
         text (str): Text that may contain a price.
@@ -28,12 +97,22 @@ def _parse_price(text: str) -> float:
     """
     if not isinstance(text, str):
         return 0.0
-    match = re.search(r'\$?(\d+\.\d{2})', text)
+    # Dollar-prefixed prices first
+    dollar = text.find('$')
+    while dollar != -1:
+        price = _price_at(text, dollar + 1)
+        if price:
+            return float(price)
+        dollar = text.find('$', dollar + 1)
+    # Fallback: first run of digits followed by two decimals
+    match = _PRICE_RE.search(text)
     if match:
         return float(match.group(1))
     return 0.0
 
-@judgment.observe(span_type="function")
+# Not traced: this is a hot, memoized helper and a span per call would
+# cost far more than the string work it caches
+@functools.lru_cache(maxsize=256)
 def _extract_item_name(item_with_quantity: str) -> str:
     """
     Removes the quantity/notes in parentheses from a grocery item string.
@@ -43,7 +122,197 @@ def _extract_item_name(item_with_quantity: str) -> str:
     Returns:
         str: Clean item name ("Milk")
     """
-    return re.sub(r'\s*\([^)]*\)', '', item_with_quantity).strip()
+    item = item_with_quantity.strip()
+    # Common case: a single trailing "(...)" segment
+    i = item.find('(')
+    if i == -1:
+        return item
+    if item.endswith(')') and item.count('(') == 1 and item.count(')') == 1:
+        return item[:i].strip()
+    return _PAREN_RE.sub('', item).strip()
+
+def _split_plan(text: str) -> tuple[str, list[str]]:
+    """
+    Splits a meal plan into its body and grocery items in a single pass.
+    The grocery section is a '# Grocery List' heading (any level) followed
+    by consecutive '- item' lines; only the first such section is used.
+
+    Args:
+        text (str): Meal planner output.
+    Returns:
+        tuple[str, list[str]]: Plan text without the grocery section, and the
+        grocery items (empty if no section was found).
+    """
+    body_lines, items, pending = [], [], []
+    in_grocery = False
+    for line in text.splitlines():
+        if in_grocery:
+            if line.startswith("- ") and len(line) > 2:
+                items.append(line[2:])
+                continue
+            if not items and not line.strip():
+                pending.append(line)
+                continue
+            in_grocery = False
+            if not items:
+                # Heading without items: not a grocery section after all
+                body_lines.extend(pending)
+            pending = []
+        if not items and line.lstrip().startswith("#") \
+                and line.lstrip().lstrip("#").strip().lower().startswith("grocery list"):
+            in_grocery = True
+            pending = [line]
+            continue
+        body_lines.append(line)
+    if not items:
+        return text.strip(), []
+    return "\n".join(body_lines).strip(), items
+
+@functools.lru_cache(maxsize=64)
+def _parse_budget(user_input: str) -> float:
+    """
+    Extracts the weekly budget from the user's request.
+
+    Args:
+        user_input (str): The user's request prompt.
+    Returns:
+        float: Budget in dollars, or 100.0 if none was given.
+    """
+    budget_match = _BUDGET_RE.search(user_input)
+    return float(budget_match.group(1)) if budget_match else 100.0
+
+def _price_cache_key(item: str) -> str:
+    """
+    Builds the on-disk cache key for an item at the configured store/location.
+    """
+    return f"{item.lower()}|{STORE}|{LOCATION}"
+
+def _load_price_cache() -> dict:
+    """
+    Loads non-expired entries from the on-disk price cache.
+
+    Returns:
+        dict: Mapping of cache key -> {"price": float, "ts": float}.
+    """
+    try:
+        with open(PRICE_CACHE_PATH, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    now = time.time()
+    return {
+        key: entry for key, entry in cache.items()
+        if isinstance(entry, dict) and now - entry.get("ts", 0) < PRICE_CACHE_TTL
+    }
+
+def _save_price_cache(cache: dict) -> None:
+    """
+    Writes the price cache to disk, ignoring filesystem errors.
+    """
+    try:
+        with open(PRICE_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+    except OSError as e:
+        logging.warning("Could not write price cache: %s", e)
+
+def _speculative_staples(user_input: str) -> list[str]:
+    """
+    Picks likely grocery staples from the user's cuisine preferences,
+    skipping anything already listed as a pantry leftover.
+
+    Args:
+        user_input (str): The user's request prompt.
+    Returns:
+        list[str]: Staple item names to price ahead of the meal plan.
+    """
+    cuisine_match = _CUISINE_RE.search(user_input)
+    pantry_match = _PANTRY_RE.search(user_input)
+    cuisines = cuisine_match.group(1).lower() if cuisine_match else ""
+    pantry = pantry_match.group(1).lower() if pantry_match else ""
+
+    staples = list(BASE_STAPLES)
+    for cuisine, extras in CUISINE_STAPLES.items():
+        if cuisine in cuisines:
+            staples.extend(extras)
+    return [item for item in dict.fromkeys(staples) if item.lower() not in pantry]
+
+# --- Token Budget ---
+class BudgetExceededError(Exception):
+    """Raised when an LLM/tool call would exceed the run's token budget."""
+
+@dataclass
+class TokenBudget:
+    """
+    Reserve-commit token budget shared by all LLM/tool calls in one run.
+
+    Calls reserve an estimate up front, then commit the actual usage (or
+    release the reservation on failure). Reservations are keyed by logical
+    action; retries inside one call (e.g. rate-limit backoff) share its
+    reservation. Concurrent calls with the same key each reserve and are
+    checked against the limit, since each one spends tokens.
+    """
+    limit: int
+    spent: int = 0
+    reserved: int = 0
+    _reservations: dict = field(default_factory=lambda: defaultdict(list))
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    async def reserve(self, key, estimated_tokens: int) -> None:
+        async with self._lock:
+            if self.spent + self.reserved + estimated_tokens > self.limit:
+                raise BudgetExceededError(
+                    f"Token budget exhausted ({self.spent} spent, {self.reserved} reserved of {self.limit})"
+                )
+            self._reservations[key].append(estimated_tokens)
+            self.reserved += estimated_tokens
+
+    def _pop(self, key) -> int:
+        held = self._reservations.get(key)
+        if not held:
+            return 0
+        estimate = held.pop()
+        if not held:
+            del self._reservations[key]
+        return estimate
+
+    async def commit(self, key, actual_tokens: int) -> None:
+        async with self._lock:
+            self.reserved -= self._pop(key)
+            self.spent += actual_tokens
+
+    async def release(self, key) -> None:
+        async with self._lock:
+            self.reserved -= self._pop(key)
+
+# Budget for the planning session in progress (None = unlimited)
+_RUN_BUDGET: ContextVar = ContextVar("run_budget", default=None)
+
+def cycles(estimate: int):
+    """
+    Guards an async agent call with the active TokenBudget.
+
+    The wrapped function accepts an optional `budget_key` keyword naming the
+    logical action its reservation belongs to; calls without one get a
+    unique key.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, budget_key=None, **kwargs):
+            budget = _RUN_BUDGET.get()
+            if budget is None:
+                return await func(*args, **kwargs)
+            key = hash(budget_key) if budget_key is not None else object()
+            await budget.reserve(key, estimate)
+            try:
+                result = await func(*args, **kwargs)
+            except BaseException:
+                await budget.release(key)
+                raise
+            usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+            await budget.commit(key, getattr(usage, "total_tokens", estimate))
+            return result
+        return wrapper
+    return decorator
 
 # --- Agents ---
 
@@ -65,6 +334,50 @@ web_search_agent = Agent(
     tools=[WebSearchTool()],
 )
 
+# --- Agent Runs ---
+# Runner exposes a stateless classmethod API, so bind each agent once up front
+_PLANNER_RUNNER = functools.partial(Runner.run, meal_planner_agent)
+_WEB_RUNNER = functools.partial(Runner.run, web_search_agent)
+
+@judgment.observe(span_type="agent", name="Meal Planner Agent Run")
+@cycles(estimate=PLANNER_TOKEN_ESTIMATE)
+async def run_meal_planner(prompt):
+    return await _PLANNER_RUNNER(prompt)
+
+@judgment.observe(span_type="agent", name="Web Search Agent Run")
+@cycles(estimate=WEB_SEARCH_TOKEN_ESTIMATE)
+async def run_web_search(prompt):
+    async with _PRICE_SEM:
+        for retry in range(MAX_SEARCH_RETRIES):
+            try:
+                return await _WEB_RUNNER(prompt)
+            except RateLimitError:
+                if retry == MAX_SEARCH_RETRIES - 1:
+                    raise
+                delay = 2 ** retry + random.random()
+                logging.warning("Rate limited by provider. Retrying web search in %.1fs...", delay)
+                await asyncio.sleep(delay)
+
+# --- Prompt Templates ---
+_FORMAT_RETRY_TMPL = (
+    "Your previous response was not formatted correctly. Please try again, "
+    "ensuring the grocery list starts with '### Grocery List' and that all items have quantities. "
+    "Original request: {orig}"
+)
+_REVISION_TMPL = (
+    "The meal plan below costs {cost}, which is over the ${budget:.2f} budget. "
+    "Its most expensive grocery items are:\n{expensive}\n"
+    "Replace these items with cheaper alternatives and update only the meals that use them. "
+    "Keep the rest of the plan unchanged, follow all rules about meal repetition and item limits, "
+    "and return the complete updated plan including the '### Grocery List'.\n\n"
+    "{plan}\n\n"
+    "Original request was: {orig}"
+)
+_REPEAT_NUDGE = (
+    "You returned exactly the same grocery list as a previous over-budget plan. "
+    "This time you MUST actually change the expensive items.\n\n"
+)
+
 # --- Orchestrator Tool ---
 @function_tool
 @judgment.observe(span_type="tool")
@@ -82,96 +395,292 @@ async def orchestrator_tool(user_input: str):
         str: Final meal plan and priced grocery list, or error message.
     """
     max_retries = 3
-    budget_match = re.search(r'Budget: \$?(\d+)', user_input)
-    budget = float(budget_match.group(1)) if budget_match else 100.0
-    logging.info(f"🎯 Budget set to: ${budget:.2f}")
+    budget = _parse_budget(user_input)
+    logging.info("🎯 Budget set to: $%.2f", budget)
 
     current_prompt = f"User's request: {user_input}."
+    partial_report = None
+
+    # Prices are cached across attempts (memory) and across runs (disk),
+    # keyed by lowercased query text
+    price_cache: dict[str, float] = {}
+    price_locks = defaultdict(asyncio.Lock)
+    disk_cache = _load_price_cache()
+    # Grocery lists already priced this run, keyed by their lowercased item set
+    seen_lists: dict[frozenset[str], tuple[dict[str, float], bool]] = {}
+
+    def cached_price(query_item):
+        key = query_item.lower()
+        if key in price_cache:
+            return price_cache[key]
+        entry = disk_cache.get(_price_cache_key(query_item))
+        return entry["price"] if entry else None
+
+    def store_price(query_item, price):
+        price_cache[query_item.lower()] = price
+        if price > 0.0:
+            disk_cache[_price_cache_key(query_item)] = {"price": price, "ts": time.time()}
+
+    async def search_price(query_item):
+        # Lock per item so concurrent duplicates share a single web search
+        async with price_locks[query_item.lower()]:
+            price = cached_price(query_item)
+            if price is None:
+                logging.info("  -> Searching price for '%s'", query_item)
+                result = await run_web_search(
+                    f"Price of {query_item} at {STORE} in {LOCATION}", budget_key=("search", query_item.lower())
+                )
+                price = _parse_price(result.final_output)
+                store_price(query_item, price)
+            return price
+
+    async def batch_price(items):
+        # Price every uncached item with a single batched search. Always use
+        # the full item text: name-only prices (e.g. prefetched staples) ignore
+        # quantities and are only a fallback in price_items.
+        pending = [item for item in dict.fromkeys(items) if cached_price(item) is None]
+        if not pending:
+            return
+        numbered = "\n".join(f"{i}. {item}" for i, item in enumerate(pending, 1))
+        result = await run_web_search(
+            f"Find the price of each item below at {STORE} in {LOCATION}. "
+            f"For each item, return a line `N. $X.YY`:\n{numbered}",
+            budget_key=("batch", tuple(pending)),
+        )
+        # Accept both "N. $X.YY" and "N. Item name: $X.YY" replies
+        for number, rest in _BATCH_LINE_RE.findall(result.final_output or ""):
+            index = int(number) - 1
+            price = _parse_price(rest)
+            if 0 <= index < len(pending) and price > 0.0:
+                store_price(pending[index], price)
+
+    async def price_items(items, stop_above=None):
+        """
+        Prices `items`, returning (prices, complete). Pricing stops early, with
+        complete=False and unpriced items at 0.0, once the running total
+        exceeds `stop_above`.
+        """
+        await batch_price(items)
+
+        # Items the batch missed get their own full-text search, then fall back
+        # to their normalized name, so e.g. "Milk (1 gallon)" and "Milk (2%)"
+        # share a single name lookup
+        missing = {item.lower(): item for item in items if not cached_price(item)}
+        weights = Counter(item.lower() for item in items if not cached_price(item))
+        # Already-known name prices stand in for missing items until (or unless)
+        # their own lookup finishes
+        provisional = {key: cached_price(_extract_item_name(item)) or 0.0 for key, item in missing.items()}
+        running_total = sum(cached_price(item) or provisional.get(item.lower(), 0.0) for item in items)
+        item_prices = {}
+
+        async def search_item(key):
+            item = missing[key]
+            price = await search_price(item)
+            if not price:
+                name = _extract_item_name(item).lower()
+                if name != key:
+                    price = await search_price(name)
+            return key, price
+
+        # Stream results so an obviously over-budget plan stops early
+        stopped = stop_above is not None and running_total > stop_above
+        tasks = [] if stopped else [asyncio.create_task(search_item(key)) for key in weights]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                key, price = await next_done
+                item_prices[key] = price
+                running_total += (price - provisional[key]) * weights[key]
+                # Only stop if there is still work left to skip
+                if stop_above is not None and running_total > stop_above \
+                        and any(not task.done() for task in tasks):
+                    logging.warning("Running total $%.2f is well over budget. Skipping remaining lookups.", running_total)
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Incomplete only if a skipped item was left without any price
+        complete = all(key in item_prices or provisional[key] for key in weights)
+        prices = []
+        for item in items:
+            key = item.lower()
+            price = cached_price(item) or item_prices.get(key) or provisional.get(key, 0.0)
+            logging.info("  - %s: $%.2f", item, price)
+            prices.append(price)
+        return prices, complete
+
+    async def prefetch_prices(items):
+        # Best effort, and limited to one batched search: a failed warmup
+        # must never abort the real run
+        try:
+            await batch_price(items)
+        except Exception as e:
+            logging.warning("Speculative price prefetch failed: %s", e)
     
-    for attempt in range(max_retries):
-        logging.info(f"--- Attempt {attempt + 1} of {max_retries} ---")
+    # Reuse the session's budget (see chat_cli), or give a standalone call its own
+    budget_token = None
+    if _RUN_BUDGET.get() is None:
+        budget_token = _RUN_BUDGET.set(TokenBudget(limit=TOKEN_BUDGET))
+    prefetch_task = None
+    try:
+        for attempt in range(max_retries):
+            logging.info("--- Attempt %d of %d ---", attempt + 1, max_retries)
         
-        @judgment.observe(span_type="agent", name="Meal Planner Agent Run")
-        async def run_meal_planner(prompt):
-            return await Runner.run(meal_planner_agent, prompt)
+            # Get meal plan from planner agent
+            logging.info("🤖 Asking Meal Planner for a new plan...")
+            # On the first attempt, price likely staples in the background while
+            # the planner is working; the planner never waits on it
+            if attempt == 0:
+                prefetch_task = asyncio.create_task(prefetch_prices(_speculative_staples(user_input)))
+            try:
+                mealplan_result = await run_meal_planner(current_prompt, budget_key=("planner", attempt))
+            except BudgetExceededError as e:
+                logging.warning("🛑 %s. Stopping early.", e)
+                break
+            mealplan_text = mealplan_result.final_output
+            partial_report = mealplan_text
+
+            # Parse grocery list from meal planner output
+            final_report_text, grocery_list_items = _split_plan(mealplan_text)
+            if not grocery_list_items:
+                # Retry if list not found or formatted wrong
+                if attempt < max_retries - 1:
+                    logging.warning("Could not find a correctly formatted grocery list. Retrying...")
+                    current_prompt = _FORMAT_RETRY_TMPL.format(orig=user_input)
+                    continue
+                # After final retry, return error
+                return mealplan_text + "\n\n⚠️ **Error: Could not extract a grocery list to check prices after several attempts.**"
         
-        # Get meal plan from planner agent
-        logging.info("🤖 Asking Meal Planner for a new plan...")
-        mealplan_result = await run_meal_planner(current_prompt)
-        mealplan_text = mealplan_result.final_output
-
-        # Parse grocery list from meal planner output
-        match = re.search(r"#+\s*Grocery List:?[\r\n]+((?:- .+\n?)+)", mealplan_text, re.IGNORECASE)
-        if not match:
-            # Retry if list not found or formatted wrong
+            # An identical list was already priced (and was over budget): reuse it
+            list_key = frozenset(map(str.lower, grocery_list_items))
+            # A partially priced list is re-priced in full on the last attempt
+            repeated = list_key in seen_lists and (seen_lists[list_key][1] or attempt < max_retries - 1)
+            if repeated:
+                logging.warning("♻️ Same grocery list as a previous attempt. Reusing its prices.")
+                known_prices, prices_complete = seen_lists[list_key]
+                prices_found = [known_prices[item.lower()] for item in grocery_list_items]
+            else:
+                logging.info("🛒 Found %d items. Looking up prices...", len(grocery_list_items))
+
+                # Look up prices asynchronously for all grocery items
+                try:
+                    prices_found, prices_complete = await price_items(
+                        grocery_list_items,
+                        # No revision follows the last attempt, so price everything
+                        stop_above=budget * EARLY_STOP_RATIO if attempt < max_retries - 1 else None,
+                    )
+                except BudgetExceededError as e:
+                    logging.warning("🛑 %s. Stopping early.", e)
+                    break
+                finally:
+                    _save_price_cache(disk_cache)
+                known_prices = {item.lower(): price for item, price in zip(grocery_list_items, prices_found)}
+                seen_lists[list_key] = (known_prices, prices_complete)
+            total_cost = sum(prices_found)
+            cost_text = f"${total_cost:.2f}" if prices_complete else f"at least ${total_cost:.2f}"
+            logging.info("💵 Calculated Total Cost: %s", cost_text)
+
+            # Prepare priced grocery list text for output
+            priced_list_text = "\n".join("- %s: $%.2f" % pair for pair in zip(grocery_list_items, prices_found))
+            partial_report = (
+                f"{final_report_text}\n\n## 🛒 Priced Grocery List (Total: ${total_cost:.2f})\n\n{priced_list_text}"
+            )
+
+            # Success: Plan is within budget
+            if total_cost <= budget:
+                logging.info("✅ Budget met! Compiling final report.")
+                return f"{final_report_text}\n\n---\n\n## 🛒 Priced Grocery List (Total: ${total_cost:.2f})\n\n{priced_list_text}"
+        
+            # Otherwise, request a revision (try up to max_retries)
             if attempt < max_retries - 1:
-                logging.warning("Could not find a correctly formatted grocery list. Retrying...")
-                current_prompt = (
-                    "Your previous response was not formatted correctly. Please try again, "
-                    "ensuring the grocery list starts with '### Grocery List' and that all items have quantities. "
-                    f"Original request: {user_input}"
+                logging.warning("❌ Plan is over budget. Asking for a revision...")
+                # Point the planner at the concrete culprits instead of regenerating from scratch
+                expensive_items = heapq.nlargest(
+                    REVISION_TOP_K,
+                    ((price, item) for price, item in zip(prices_found, grocery_list_items) if price > 0.0),
+                )
+                expensive_text = "\n".join(f"- {item}: ${price:.2f}" for price, item in expensive_items)
+                current_prompt = _REVISION_TMPL.format(
+                    cost=cost_text, budget=budget, expensive=expensive_text, plan=mealplan_text, orig=user_input
+                )
+                if repeated:
+                    current_prompt = _REPEAT_NUDGE + current_prompt
+            else:
+                # After final attempt, return best effort
+                return (
+                    f"⚠️ **Failed to create a plan within the ${budget:.2f} budget after {max_retries} attempts.**\n"
+                    f"The cheapest plan generated had a cost of {cost_text}.\n\n"
+                    f"Here is the final meal plan and its priced list:\n{final_report_text}\n\n"
+                    f"## 🛒 Priced Grocery List (Total: ${total_cost:.2f})\n\n{priced_list_text}"
                 )
-                continue
-            # After final retry, return error
-            return mealplan_text + "\n\n⚠️ **Error: Could not extract a grocery list to check prices after several attempts.**"
-        
-        grocery_list_items = re.findall(r"- ([^\n]+)", match.group(1))
-        logging.info(f"🛒 Found {len(grocery_list_items)} items. Looking up prices...")
 
-        # Look up prices asynchronously for all grocery items
-        
-        async def get_price(item_text):
-            
-            @judgment.observe(span_type="agent", name="Web Search Agent Run")
-            async def run_web_search(prompt):
-                return await Runner.run(web_search_agent, prompt)
-            query_full = f"Price of {item_text} at Walmart in Watertown, Connecticut"
-            result_full = await run_web_search(query_full)
-            price = _parse_price(result_full.final_output)
-
-            # Fallback to just the core item name if full search fails
-            if price == 0.0:
-                item_name_only = _extract_item_name(item_text)
-                if item_name_only != item_text:
-                    logging.info(f"  -> Fallback search for '{item_name_only}'")
-                    query_fallback = f"Price of {item_name_only} at Walmart in Watertown, Connecticut"
-                    result_fallback = await run_web_search(query_fallback)
-                    price = _parse_price(result_fallback.final_output)
-
-            logging.info(f"  - {item_text}: ${price:.2f}")
-            return price
+        # Only reached when the token budget ran out mid-run
+        if partial_report is None:
+            return "⚠️ **Stopped early: the token budget was exhausted before a meal plan was generated.**"
+        return (
+            "⚠️ **Stopped early: the token budget was exhausted before the plan could be finalized.**\n\n"
+            f"Here is the most recent plan:\n{partial_report}"
+        )
+    finally:
+        if prefetch_task is not None and not prefetch_task.done():
+            prefetch_task.cancel()
+        if budget_token is not None:
+            _RUN_BUDGET.reset(budget_token)
+
+# --- CLI (User Interaction Loop) ---
+async def _ainput(prompt: str) -> str:
+    """
+    Reads a line of user input without blocking the event loop.
 
-        prices_found = await asyncio.gather(*[get_price(item) for item in grocery_list_items])
-        total_cost = sum(prices_found)
-        logging.info(f"💵 Calculated Total Cost: ${total_cost:.2f}")
+    Uses a daemon thread rather than the default executor, so Ctrl+C at a
+    prompt exits immediately instead of waiting for the user to press Enter.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
 
-        # Prepare priced grocery list text for output
-        priced_list_text = "\n".join([f"- {item}: ${price:.2f}" for item, price in zip(grocery_list_items, prices_found)])
-        final_report_text = re.sub(r"#+\s*Grocery List:?[\r\n]+((?:- .+\n?)+)", "", mealplan_text, flags=re.IGNORECASE).strip()
+    def deliver(setter, value):
+        if not future.done():
+            setter(value)
 
-        # Success: Plan is within budget
-        if total_cost <= budget:
-            logging.info("✅ Budget met! Compiling final report.")
-            return f"{final_report_text}\n\n---\n\n## 🛒 Priced Grocery List (Total: ${total_cost:.2f})\n\n{priced_list_text}"
-        
-        # Otherwise, request a revision (try up to max_retries)
-        if attempt < max_retries - 1:
-            logging.warning(f"❌ Plan is over budget. Asking for a revision...")
-            current_prompt = (
-                f"Your last plan was too expensive at ${total_cost:.2f}. The grocery list was:\n{priced_list_text}\n"
-                "Please generate a NEW, cheaper meal plan. Remember to follow all rules about meal repetition and item limits. "
-                f"Original request was: {user_input}"
-            )
+    def read():
+        try:
+            result = input(prompt)
+        except BaseException as e:
+            setter, value = future.set_exception, e
         else:
-            # After final attempt, return best effort
-            return (
-                f"⚠️ **Failed to create a plan within the ${budget:.2f} budget after {max_retries} attempts.**\n"
-                f"The cheapest plan generated had a cost of ${total_cost:.2f}.\n\n"
-                f"Here is the final meal plan and its priced list:\n{final_report_text}\n\n"
-                f"## 🛒 Priced Grocery List (Total: ${total_cost:.2f})\n\n{priced_list_text}"
-            )
+            setter, value = future.set_result, result
+        try:
+            loop.call_soon_threadsafe(deliver, setter, value)
+        except RuntimeError:
+            pass  # Loop already closed (e.g. after Ctrl+C)
+
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
+async def _warm_up() -> Agent:
+    """
+    Builds the orchestrator agent and opens the OpenAI connection pool while
+    the user is still answering questions.
+
+    Returns:
+        Agent: The orchestrator agent, ready to run.
+    """
+    orchestrator_agent = Agent(
+        name="Orchestrator Agent",
+        tools=[orchestrator_tool],
+        model="gpt-4o",
+        instructions="You are a master coordinator. Use your tool to fulfill the user's meal planning request, including adhering to their budget and efficiency goals."
+    )
+    # Share one client with the agents SDK so the warmed connections get reused
+    client = AsyncOpenAI()
+    set_default_openai_client(client)
+    try:
+        await client.models.list()
+    except Exception as e:
+        logging.warning("Connection warmup failed: %s", e)
+    return orchestrator_agent
 
-# --- CLI (User Interaction Loop) ---
 @judgment.observe(span_type="chain") 
 async def chat_cli():
     """
@@ -181,13 +690,21 @@ async def chat_cli():
     print("\nWelcome to the Efficient Meal Planner! Let's create your plan.")
     print("Please answer the following questions. You can press Enter to leave any field blank.")
 
-    # Gather all user inputs
-    nutrition_goals = input("🥗 What are your nutrition goals (e.g., high protein, low carb)?\n> ")
-    cultural_preferences = input("🌮 Any cultural preferences for food (e.g., Mexican, Italian)?\n> ")
-    dietary_restrictions = input("🥜 Any dietary restrictions (e.g., gluten-free, vegetarian)?\n> ")
-    pantry_leftovers = input("🥫 What's in your pantry to use (comma-separated)?\n> ")
-    budget_input = input("💰 What is your weekly budget for new groceries (e.g., 100)?\n> ")
-    item_limit_input = input("🛒 Any limit on the number of new grocery items (e.g., 10, or leave blank)?\n> ")
+    # Gather all user inputs (in a thread, so the event loop stays free)
+    nutrition_goals = await _ainput("🥗 What are your nutrition goals (e.g., high protein, low carb)?\n> ")
+    cultural_preferences = await _ainput("🌮 Any cultural preferences for food (e.g., Mexican, Italian)?\n> ")
+    dietary_restrictions = await _ainput("🥜 Any dietary restrictions (e.g., gluten-free, vegetarian)?\n> ")
+    pantry_leftovers = await _ainput("🥫 What's in your pantry to use (comma-separated)?\n> ")
+    budget_input = await _ainput("💰 What is your weekly budget for new groceries (e.g., 100)?\n> ")
+    # Warm up the orchestrator while the last question is answered
+    warmup_task = asyncio.create_task(_warm_up())
+    try:
+        item_limit_input = await _ainput("🛒 Any limit on the number of new grocery items (e.g., 10, or leave blank)?\n> ")
+    except BaseException:
+        # Don't leave the warmup orphaned if the prompt fails (EOF, Ctrl+C)
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+        raise
     
     # Build user prompt for orchestrator agent
     prompt_details = [
@@ -207,17 +724,19 @@ async def chat_cli():
     print("------------------------------------------------------------------")
     
     # Orchestrator Agent runs the workflow using the tool
-    orchestrator_agent = Agent(
-        name="Orchestrator Agent",
-        tools=[orchestrator_tool],
-        model="gpt-4o",
-        instructions="You are a master coordinator. Use your tool to fulfill the user's meal planning request, including adhering to their budget and efficiency goals."
-    )
+    orchestrator_agent = await warmup_task
     
     @judgment.observe(span_type="agent", name="Orchestrator Agent Run")
     async def run_orchestrator(prompt):
         return await Runner.run(orchestrator_agent, prompt)
-    result = await run_orchestrator(user_prompt)
+
+    # One token budget for the whole session, even if the orchestrator
+    # calls its tool more than once
+    budget_token = _RUN_BUDGET.set(TokenBudget(limit=TOKEN_BUDGET))
+    try:
+        result = await run_orchestrator(user_prompt)
+    finally:
+        _RUN_BUDGET.reset(budget_token)
     
     print("\n## 📄 Your Meal Plan & Priced Grocery List\n" + result.final_output)
 